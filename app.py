@@ -1,10 +1,20 @@
 import streamlit as st
+import pandas as pd
+import requests
 import time
 import io
 from datetime import datetime
 from fpdf import FPDF
-from src.council import CouncilMember, CouncilOrchestrator, Chairman, get_available_models, PerformanceMetrics
-from config import COUNCIL_MEMBERS_CONFIG, CHAIRMAN_CONFIG
+from src.council import (
+    CouncilMember, CouncilOrchestrator, Chairman, get_available_models, format_conversation,
+    model_speed_rank, PerformanceMetrics
+)
+from src.cache import PromptCache, SemanticCache
+from config import (
+    COUNCIL_MEMBERS_CONFIG, CHAIRMAN_CONFIG, EMBEDDING_MODEL,
+    SEMANTIC_CACHE_CONFIG, PROMPT_CACHE_CONFIG, CONSENSUS_CONFIG, STAGE_TIMEOUT_SECONDS,
+    SINGLE_REVIEWER, NUM_CTX
+)
 
 st.set_page_config(page_title="Local LLM Council", layout="wide")
 
@@ -105,6 +115,10 @@ if 'orchestrator' not in st.session_state:
     st.session_state.orchestrator = None
 if 'health_status' not in st.session_state:
     st.session_state.health_status = {}
+if 'conversation_history' not in st.session_state:
+    st.session_state.conversation_history = []  # (query, final_answer) of previous turns
+
+MAX_HISTORY_TURNS = 5
 
 # --- Deployment Mode Selection ---
 deployment_mode = st.sidebar.radio(
@@ -113,37 +127,93 @@ deployment_mode = st.sidebar.radio(
     help="Choose 'Local' to run everything on this machine using one Ollama instance. Choose 'Distributed' to use the IPs defined in config.py."
 )
 
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_available_models():
+    """Streamlit reruns the script on every widget change; avoid querying /api/tags each time."""
+    return get_available_models()
+
+@st.cache_resource
+def get_prompt_cache():
+    """Shared across sessions and reruns so the SQLite file is opened only once."""
+    if not PROMPT_CACHE_CONFIG["enabled"]:
+        return None
+    return PromptCache(path=PROMPT_CACHE_CONFIG["path"], maxsize=PROMPT_CACHE_CONFIG["maxsize"],
+                       ttl=PROMPT_CACHE_CONFIG["ttl"])
+
+def get_embedder(base_url):
+    return CouncilMember(name="Embedder", base_url=base_url, model=EMBEDDING_MODEL)
+
+def build_semantic_cache(base_url):
+    """Creates the semantic cache described in config.py, embedding queries on `base_url`."""
+    if not SEMANTIC_CACHE_CONFIG["enabled"]:
+        return None
+    return SemanticCache(
+        get_embedder(base_url).embed,
+        threshold=SEMANTIC_CACHE_CONFIG["threshold"],
+        max_entries=SEMANTIC_CACHE_CONFIG["max_entries"],
+        path=SEMANTIC_CACHE_CONFIG["path"]
+    )
+
+def replace_orchestrator(orch):
+    """Installs a new council, releasing the threads of the previous one."""
+    if st.session_state.orchestrator is not None:
+        st.session_state.orchestrator.close()
+    st.session_state.orchestrator = orch
+
+def build_orchestrator(members, chairman, num_parallel=None):
+    """Wires the caches and optional features from config.py around a council."""
+    return CouncilOrchestrator(
+        members, chairman,
+        num_parallel=num_parallel,
+        semantic_cache=build_semantic_cache(chairman.base_url),
+        prompt_cache=get_prompt_cache(),
+        embed_fn=get_embedder(chairman.base_url).embed if CONSENSUS_CONFIG["enabled"] else None,
+        consensus_threshold=CONSENSUS_CONFIG["threshold"],
+        stage_timeout=STAGE_TIMEOUT_SECONDS,
+        single_reviewer=SINGLE_REVIEWER
+    )
+
 def initialize_local_council(council_models, chairman_model):
     members = []
     # Create members with unique names even if models are same
     for i, model in enumerate(council_models):
-        members.append(CouncilMember(name=f"Member_{i+1} ({model})", base_url="http://localhost:11434", model=model))
+        members.append(CouncilMember(name=f"Member_{i+1} ({model})", base_url="http://localhost:11434", model=model,
+                                     num_ctx=NUM_CTX))
     
-    chairman = Chairman(name=f"Chairman ({chairman_model})", base_url="http://localhost:11434", model=chairman_model)
-    return CouncilOrchestrator(members, chairman)
+    chairman = Chairman(name=f"Chairman ({chairman_model})", base_url="http://localhost:11434", model=chairman_model,
+                        num_ctx=NUM_CTX)
+    return build_orchestrator(members, chairman)
 
 def initialize_distributed_council():
     members = [
-        CouncilMember(name=cfg["name"], base_url=cfg["api_url"], model=cfg["model"])
+        CouncilMember(name=cfg["name"], base_url=cfg["api_url"], model=cfg["model"], num_ctx=NUM_CTX)
         for cfg in COUNCIL_MEMBERS_CONFIG
     ]
-    chairman = Chairman(name=CHAIRMAN_CONFIG["name"], base_url=CHAIRMAN_CONFIG["api_url"], model=CHAIRMAN_CONFIG["model"])
-    return CouncilOrchestrator(members, chairman)
+    chairman = Chairman(name=CHAIRMAN_CONFIG["name"], base_url=CHAIRMAN_CONFIG["api_url"], model=CHAIRMAN_CONFIG["model"],
+                       num_ctx=NUM_CTX)
+    return build_orchestrator(members, chairman)
 
 # --- Configuration UI ---
 if deployment_mode == "Local (Single Machine)":
     st.sidebar.subheader("Local Configuration")
-    available_models = get_available_models()
+    available_models = cached_available_models()
     
     if not available_models:
         st.sidebar.error("⚠️ Could not connect to Ollama at http://localhost:11434. Is it running?")
         if st.sidebar.button("Retry Connection"):
+            cached_available_models.clear()
             st.rerun()
     else:
         st.sidebar.success(f"Found {len(available_models)} models.")
         
         # Default selection logic
-        default_council = available_models[:3] if len(available_models) >= 3 else available_models
+        prefer_fast = st.sidebar.checkbox(
+            "Prefer fast model variants",
+            value=True,
+            help="Pre-select small and quantized builds (e.g. q4_K_M, 8b) rather than large or full-precision ones."
+        )
+        candidates = sorted(available_models, key=model_speed_rank) if prefer_fast else available_models
+        default_council = candidates[:3]
         
         selected_council_models = st.sidebar.multiselect(
             "Select Council Members (at least 2)",
@@ -161,10 +231,11 @@ if deployment_mode == "Local (Single Machine)":
             if len(selected_council_models) < 2:
                 st.sidebar.warning("Please select at least 2 council members.")
             else:
-                with st.spinner("Initializing..."):
+                with st.spinner("Initializing and loading models..."):
                     orch = initialize_local_council(selected_council_models, selected_chairman_model)
-                    st.session_state.orchestrator = orch
+                    replace_orchestrator(orch)
                     st.session_state.health_status = orch.check_health()
+                    orch.warm_up()
                     st.rerun()
 
 else: # Distributed
@@ -212,6 +283,11 @@ else: # Distributed
 
 5. **Add the member** below with the IP address (e.g., `http://192.168.1.15:11434`)
 
+💡 **Let the server answer members in parallel** (one slot per member, one loaded model per distinct model):
+   ```bash
+   OLLAMA_HOST=0.0.0.0 OLLAMA_NUM_PARALLEL=3 OLLAMA_MAX_LOADED_MODELS=3 ollama serve
+   ```
+
 ⚠️ **All machines must be on the same network (LAN)**
         """)
     
@@ -222,64 +298,54 @@ else: # Distributed
             value="http://localhost:11434",
             help="This URL will be used when adding new members"
         )
+        
+        # Recommended server settings for the busiest server of the current member list
+        members_per_server = {}
+        for member in st.session_state.distributed_members:
+            members_per_server.setdefault(member["api_url"], []).append(member["model"])
+        busiest = max(members_per_server.values(), key=len, default=[])
+        
+        num_parallel = st.number_input(
+            "Parallel requests per server (OLLAMA_NUM_PARALLEL)",
+            min_value=1,
+            max_value=64,
+            value=max(len(busiest), 1),
+            key="num_parallel",
+            help="The council never sends a server more concurrent requests than this. "
+                 "Use the same value as OLLAMA_NUM_PARALLEL on the servers: one slot per member they host."
+        )
+        max_loaded_models = max(len(set(busiest)), 1)
+        st.caption("Start each server with matching settings "
+                   f"(OLLAMA_MAX_LOADED_MODELS ≥ {max_loaded_models} distinct models on the busiest server):")
+        st.code(
+            f"OLLAMA_HOST=0.0.0.0 OLLAMA_NUM_PARALLEL={num_parallel} "
+            f"OLLAMA_MAX_LOADED_MODELS={max_loaded_models} ollama serve",
+            language="bash"
+        )
     
     # --- Council Members Editor ---
     with st.sidebar.expander("👥 Council Members", expanded=True):
-        members_to_remove = []
+        # A single table widget instead of three inputs per member. It is seeded once:
+        # edits are kept in the widget state and returned in `edited_members`.
+        if 'members_table_data' not in st.session_state:
+            st.session_state.members_table_data = pd.DataFrame(
+                st.session_state.distributed_members, columns=["name", "api_url", "model"]
+            )
         
-        for i, member in enumerate(st.session_state.distributed_members):
-            st.markdown(f"**Member {i+1}**")
-            col1, col2 = st.columns([3, 1])
-            
-            with col1:
-                # Name
-                new_name = st.text_input(
-                    "Name", 
-                    value=member["name"], 
-                    key=f"member_name_{i}",
-                    label_visibility="collapsed"
-                )
-                st.session_state.distributed_members[i]["name"] = new_name
-                
-                # API URL
-                new_url = st.text_input(
-                    "API URL",
-                    value=member["api_url"],
-                    key=f"member_url_{i}",
-                    label_visibility="collapsed",
-                    placeholder="http://IP:11434"
-                )
-                st.session_state.distributed_members[i]["api_url"] = new_url
-                
-                # Model
-                new_model = st.text_input(
-                    "Model",
-                    value=member["model"],
-                    key=f"member_model_{i}",
-                    label_visibility="collapsed",
-                    placeholder="llama3.2:1b"
-                )
-                st.session_state.distributed_members[i]["model"] = new_model
-            
-            with col2:
-                if st.button("🗑️", key=f"remove_member_{i}", help="Remove this member"):
-                    members_to_remove.append(i)
-            
-            st.markdown("---")
-        
-        # Remove members marked for deletion
-        for idx in sorted(members_to_remove, reverse=True):
-            st.session_state.distributed_members.pop(idx)
-            st.rerun()
-        
-        # Add new member button
-        if st.button("➕ Add Member"):
-            st.session_state.distributed_members.append({
-                "name": f"Member_{len(st.session_state.distributed_members) + 1}",
-                "api_url": default_url,
-                "model": "llama3.2:1b"
-            })
-            st.rerun()
+        edited_members = st.data_editor(
+            st.session_state.members_table_data,
+            num_rows="dynamic",
+            key="members_table",
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "name": st.column_config.TextColumn("Name", required=True),
+                "api_url": st.column_config.TextColumn("API URL", default=default_url, required=True),
+                "model": st.column_config.TextColumn("Model", default="llama3.2:1b", required=True)
+            }
+        )
+        st.caption("Add a member with the empty last row; select rows and press Delete to remove them.")
+        st.session_state.distributed_members = edited_members.dropna().to_dict("records")
     
     # --- Chairman Editor ---
     with st.sidebar.expander("👑 Chairman", expanded=True):
@@ -308,19 +374,21 @@ else: # Distributed
         if len(st.session_state.distributed_members) < 2:
             st.sidebar.warning("Please add at least 2 council members.")
         else:
-            with st.spinner("Connecting to nodes..."):
+            with st.spinner("Connecting to nodes and loading models..."):
                 members = [
-                    CouncilMember(name=cfg["name"], base_url=cfg["api_url"], model=cfg["model"])
+                    CouncilMember(name=cfg["name"], base_url=cfg["api_url"], model=cfg["model"], num_ctx=NUM_CTX)
                     for cfg in st.session_state.distributed_members
                 ]
                 chairman = Chairman(
                     name=st.session_state.distributed_chairman["name"],
                     base_url=st.session_state.distributed_chairman["api_url"],
-                    model=st.session_state.distributed_chairman["model"]
+                    model=st.session_state.distributed_chairman["model"],
+                    num_ctx=NUM_CTX
                 )
-                orch = CouncilOrchestrator(members, chairman)
-                st.session_state.orchestrator = orch
+                orch = build_orchestrator(members, chairman, num_parallel=int(num_parallel))
+                replace_orchestrator(orch)
                 st.session_state.health_status = orch.check_health()
+                orch.warm_up()
                 st.rerun()
 
 # --- Status Display & Performance Dashboard ---
@@ -377,15 +445,13 @@ if st.session_state.orchestrator:
             if metrics.total_requests > 0:
                 st.progress(metrics.success_rate / 100)
                 st.caption(f"Success Rate: {metrics.success_rate:.0f}% ({metrics.successful_requests}/{metrics.total_requests})")
+            if metrics.cache_hits > 0:
+                st.caption(f"Cache Hits: {metrics.cache_hits}")
 
-    # Filter active members for execution
-    active_members = [m for m in orch.members if health.get(m.name, False)]
-    orch.members = active_members
-    
     # Refresh button
     st.sidebar.markdown("---")
     if st.sidebar.button("🔄 Refresh Status"):
-        st.session_state.health_status = orch.check_health()
+        st.session_state.health_status = orch.check_health(force=True)
         st.rerun()
 
 # --- Main Application Logic ---
@@ -395,80 +461,116 @@ if st.session_state.orchestrator:
     # Main Query Interface
     query = st.text_area("Enter your query:", height=100)
     
+    history = st.session_state.conversation_history
+    if history:
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.caption(f"💬 Follow-up to {len(history)} previous question(s). The council sees the conversation so far.")
+        with col2:
+            if st.button("🧹 New conversation"):
+                st.session_state.conversation_history = []
+                st.rerun()
+    
     if st.button("Ask the Council"):
         if not query:
             st.warning("Please enter a query.")
-        elif not orch.members:
+        elif not orch.active_members():
             st.error("No active council members found. Please check your configuration and connections.")
-        elif not st.session_state.health_status.get(orch.chairman.name, False):
+        elif not orch.chairman_available():
              st.error("Chairman is offline. Cannot proceed.")
         else:
             # Progress Container
             progress_container = st.container()
             
+            council_query = format_conversation(query, history)
+            
             # Stage 1: Opinions
             with progress_container:
                 st.subheader("Stage 1: Gathering Opinions")
-                start_time = time.time()
-                with st.spinner("Council members are thinking..."):
-                    opinions = orch.gather_opinions(query)
-                stage1_time = (time.time() - start_time) * 1000
+                start_time = time.perf_counter_ns()
+                stage_times = {}
+                
+                def show_opinions(opinions):
+                    """Renders Stage 1 as soon as it is done; reviews may already be running."""
+                    stage_times['stage1'] = (time.perf_counter_ns() - start_time) / 1e6
+                    if not opinions:
+                        return
+                    
+                    # Stage 1 Performance Summary
+                    st.caption(f"⏱️ Stage 1 completed in {stage_times['stage1']:.0f}ms")
+                    
+                    # Display Opinions in Tabs with latency info
+                    tab_names = [f"{op.member_name} ({op.latency_ms:.0f}ms)" for op in opinions]
+                    tabs = st.tabs(tab_names)
+                    for i, tab in enumerate(tabs):
+                        with tab:
+                            # Latency indicator
+                            latency = opinions[i].latency_ms
+                            if latency < 5000:
+                                latency_color = "🟢"
+                            elif latency < 15000:
+                                latency_color = "🟡"
+                            else:
+                                latency_color = "🔴"
+                            
+                            col1, col2 = st.columns([4, 1])
+                            with col2:
+                                st.metric("Response Time", f"{latency:.1f}s" if latency > 1000 else f"{latency:.0f}ms")
+                            
+                            st.markdown(opinions[i].content)
+                    
+                    st.subheader("Stage 2: Peer Review & Ranking")
                 
-                if not opinions:
+                # Reviews start while slower members are still answering, so both stages share a spinner
+                with st.spinner("Council members are thinking and reviewing each other..."):
+                    reviewed_opinions = orch.gather_and_review(council_query, on_opinions=show_opinions)
+                
+                if not reviewed_opinions:
                     st.error("Failed to gather opinions.")
                     st.stop()
                 
-                # Stage 1 Performance Summary
-                st.caption(f"⏱️ Stage 1 completed in {stage1_time:.0f}ms")
+                opinions = reviewed_opinions
+                stage1_time = stage_times['stage1']
+                stage2_time = (time.perf_counter_ns() - start_time) / 1e6 - stage1_time
                 
-                # Display Opinions in Tabs with latency info
-                tab_names = [f"{op.member_name} ({op.latency_ms:.0f}ms)" for op in opinions]
-                tabs = st.tabs(tab_names)
-                for i, tab in enumerate(tabs):
-                    with tab:
-                        # Latency indicator
-                        latency = opinions[i].latency_ms
-                        if latency < 5000:
-                            latency_color = "🟢"
-                        elif latency < 15000:
-                            latency_color = "🟡"
-                        else:
-                            latency_color = "🔴"
-                        
-                        col1, col2 = st.columns([4, 1])
-                        with col2:
-                            st.metric("Response Time", f"{latency:.1f}s" if latency > 1000 else f"{latency:.0f}ms")
-                        
-                        st.markdown(opinions[i].content)
-
-            # Stage 2: Peer Review
-            with progress_container:
-                st.subheader("Stage 2: Peer Review & Ranking")
-                start_time = time.time()
-                with st.spinner("Members are reviewing each other..."):
-                    reviewed_opinions = orch.peer_review(query, opinions)
-                stage2_time = (time.time() - start_time) * 1000
-                
-                st.caption(f"⏱️ Stage 2 completed in {stage2_time:.0f}ms")
+                st.caption(f"⏱️ Stage 2 completed {stage2_time:.0f}ms after Stage 1")
                 
                 with st.expander("View Peer Reviews"):
                     for op in reviewed_opinions:
-                        st.markdown(f"### Reviews for {op.member_name}'s Answer")
+                        score_text = f" (average score {op.score:.1f}/10)" if op.score else ""
+                        st.markdown(f"### Reviews for {op.member_name}'s Answer{score_text}")
                         if op.reviews:
                             for rev in op.reviews:
                                 st.info(rev)
                         else:
                             st.write("No reviews received.")
+                    if orch.general_reviews:
+                        st.markdown("### Reviews covering several answers")
+                        for reviewer_name, review in orch.general_reviews.items():
+                            st.info(f"Review by {reviewer_name}:\n{review}")
 
             # Stage 3: Chairman Synthesis
             with progress_container:
                 st.subheader("Stage 3: Chairman's Final Verdict")
-                start_time = time.time()
-                with st.spinner("The Chairman is synthesizing the final answer..."):
-                    final_answer, chairman_latency = orch.chairman.synthesize(query, reviewed_opinions)
-                stage3_time = (time.time() - start_time) * 1000
+                st.markdown("### 🎓 Chairman's Synthesis")
+                start_time = time.perf_counter_ns()
+                # Tokens are rendered as the Chairman writes them instead of after a spinner
+                stream_error = None
+                try:
+                    final_answer = st.write_stream(orch.synthesize_stream(council_query, reviewed_opinions))
+                except (requests.RequestException, ValueError) as e:
+                    # The answer was cut off: never keep a truncated verdict
+                    final_answer, stream_error = None, e
+                stage3_time = (time.perf_counter_ns() - start_time) / 1e6
                 
-                st.success("Final Answer Generated")
+                if final_answer:
+                    st.success("Final Answer Generated")
+                    # Turns are only appended, so the prompt prefix stays identical for the next follow-up
+                    history.append((query, final_answer))
+                    del history[:-MAX_HISTORY_TURNS]
+                else:
+                    final_answer = "Failed to generate synthesis."
+                    st.error(f"{final_answer} ({stream_error})" if stream_error else final_answer)
                 
                 # Performance summary
                 total_time = stage1_time + stage2_time + stage3_time
@@ -481,14 +583,10 @@ if st.session_state.orchestrator:
                 with perf_cols[1]:
                     st.metric("Stage 2", f"{stage2_time/1000:.1f}s")
                 with perf_cols[2]:
-                    st.metric("Stage 3", f"{chairman_latency/1000:.1f}s")
+                    st.metric("Stage 3", f"{stage3_time/1000:.1f}s")
                 with perf_cols[3]:
                     st.metric("Total", f"{total_time/1000:.1f}s", delta=f"{len(opinions)} opinions")
                 
-                st.markdown("---")
-                st.markdown("### 🎓 Chairman's Synthesis")
-                st.markdown(final_answer)
-                
                 # --- PDF Export ---
                 st.markdown("---")
                 st.markdown("### 📄 Export Report")
@@ -496,7 +594,7 @@ if st.session_state.orchestrator:
                 performance_data = {
                     'stage1': stage1_time / 1000,
                     'stage2': stage2_time / 1000,
-                    'stage3': chairman_latency / 1000,
+                    'stage3': stage3_time / 1000,
                     'total': total_time / 1000,
                     'num_opinions': len(opinions)
                 }
@@ -29,3 +29,45 @@ CHAIRMAN_CONFIG = {
     "api_url": OLLAMA_SERVER_URL, 
     "model": "llama3.2:1b"
 }
+
+# Embedding model used by the semantic cache and the early consensus check below.
+# It must be available on the Chairman's Ollama server, e.g. `ollama pull nomic-embed-text`
+EMBEDDING_MODEL = "nomic-embed-text"
+
+# Semantic cache: serves a previous council run again when a new query is close enough
+# to an old one (cosine similarity of their embeddings >= threshold).
+SEMANTIC_CACHE_CONFIG = {
+    "enabled": False,
+    "threshold": 0.87,
+    "max_entries": 128,
+    "path": "~/.llm_council_semantic_cache.json"
+}
+
+# Exact-match prompt cache: identical prompts sent to the same model are answered
+# from disk instead of calling Ollama again. Entries expire after `ttl` seconds and at
+# most `maxsize` responses are kept in memory.
+PROMPT_CACHE_CONFIG = {
+    "enabled": False,
+    "path": "~/.llm_council_cache.db",
+    "maxsize": 500,
+    "ttl": 3600
+}
+
+# Early consensus: Stage 1 stops waiting for the slowest members as soon as a majority
+# of the council gave similar answers (cosine similarity of their embeddings >= threshold).
+CONSENSUS_CONFIG = {
+    "enabled": False,
+    "threshold": 0.9
+}
+
+# Seconds Stages 1 and 2 wait for their slowest member. Members still generating after
+# that are marked "timeout" and the council goes on without them (None waits indefinitely).
+STAGE_TIMEOUT_SECONDS = 180
+
+# With SINGLE_REVIEWER the Chairman reviews all opinions in one call instead of every member
+# reviewing the others: one request instead of one per member, at the cost of a single judge.
+SINGLE_REVIEWER = False
+
+# Context window (tokens) of every Ollama call. Ollama allocates num_ctx x OLLAMA_NUM_PARALLEL
+# of KV cache per loaded model, so raise it only if the models fit in GPU memory.
+NUM_CTX = 4096
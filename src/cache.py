@@ -0,0 +1,188 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+class PromptCache:
+    """
+    Exact-match cache of model responses, keyed by a hash of the model and the full prompt.
+
+    Responses are kept in memory and, when `path` is given, in a SQLite file so they
+    survive restarts of the app. At most `maxsize` responses stay in memory (least
+    recently used evicted first) and entries older than `ttl` seconds are ignored and
+    deleted from the file.
+    """
+
+    PURGE_EVERY = 100  # Writes between two deletions of expired rows
+
+    def __init__(self, path: Optional[str] = None, maxsize: int = 500, ttl: Optional[float] = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # key -> (stored at, response)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(os.path.expanduser(path), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses "
+                             "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)")
+            self._purge_expired()
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, prompt: str) -> str:
+        # NUL separators cannot appear in the fields, so distinct triples never share a key
+        return hashlib.blake2b(f"{model}\0{system_prompt}\0{prompt}".encode("utf-8"), digest_size=32).hexdigest()
+
+    def _is_fresh(self, created: float) -> bool:
+        return self.ttl is None or time.time() - created < self.ttl
+
+    def _purge_expired(self):
+        """Deletes the expired rows of the SQLite file so it does not grow without bound."""
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+
+    def _remember(self, key: str, created: float, response: str):
+        self._memory[key] = (created, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._memory:
+                created, response = self._memory[key]
+                if self._is_fresh(created):
+                    self._memory.move_to_end(key)
+                    return response
+                del self._memory[key]
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if not self._is_fresh(row[1]):
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._remember(key, row[1], row[0])
+            return row[0]
+
+    def set(self, key: str, response: str):
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, response)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                                 (key, response, created))
+                self._writes += 1
+                if self._writes % self.PURGE_EVERY == 0:
+                    self._purge_expired()
+                self._db.commit()
+
+def _normalize(vector: List[float]) -> List[float]:
+    """Scales a vector to unit length so cosine similarity becomes a dot product."""
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm == 0:
+        return vector
+    return [x / norm for x in vector]
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    return sum(x * y for x, y in zip(_normalize(a), _normalize(b)))
+
+class SemanticCache:
+    """
+    Remembers completed council runs and serves them again for near-identical queries.
+
+    Queries are compared by the cosine similarity of their embeddings. Entries are
+    kept in LRU order in memory and optionally persisted to a JSON file.
+    """
+
+    def __init__(self, embed_fn: Callable[[str], Optional[List[float]]], threshold: float = 0.87,
+                 max_entries: int = 128, path: Optional[str] = None):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.path = os.path.expanduser(path) if path else None
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._vectors: "OrderedDict[str, List[float]]" = OrderedDict()  # Recent query embeddings
+        self._lock = threading.Lock()
+        self._load()
+
+    def _embed(self, query: str) -> Optional[List[float]]:
+        """Embeds a query, reusing the vector if the same query was embedded recently."""
+        with self._lock:
+            if query in self._vectors:
+                self._vectors.move_to_end(query)
+                return self._vectors[query]
+        vector = self.embed_fn(query)
+        if not vector:
+            return None
+        vector = _normalize(vector)
+        with self._lock:
+            self._vectors[query] = vector
+            while len(self._vectors) > 32:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def lookup(self, query: str, council: List[str]) -> Optional[Dict]:
+        """Returns the stored run closest to `query` for the same council, or None below the threshold."""
+        vector = self._embed(query)
+        if vector is None:
+            return None
+
+        best_key, best_score = None, self.threshold
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry["council"] != council:
+                    continue
+                score = sum(a * b for a, b in zip(vector, entry["embedding"]))
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key]
+
+    def store(self, query: str, council: List[str], opinions: List[Dict], final_answer: str):
+        """Records a completed run, evicting the least recently used entries beyond `max_entries`."""
+        vector = self._embed(query)
+        if vector is None:
+            return
+
+        with self._lock:
+            self._entries[query] = {
+                "council": council,
+                "embedding": vector,
+                "opinions": opinions,
+                "final_answer": final_answer
+            }
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._save()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = OrderedDict(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Could not load semantic cache from {self.path}: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = list(self._entries.items())
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(OrderedDict(snapshot), f)
+        except OSError as e:
+            print(f"Could not save semantic cache to {self.path}: {e}")
@@ -1,20 +1,205 @@
+import contextlib
+import functools
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import threading
+import numpy as np
+import orjson
 import requests
-from typing import List, Dict, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Callable, List, Dict, Iterator, Optional, Tuple
 import concurrent.futures
 import time
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict
+from src.cache import PromptCache, SemanticCache, cosine_similarity
+
+MODELS_TTL = 5.0  # Seconds get_available_models reuses a server's model list
+_models_cache: Dict[str, Tuple[float, List[str]]] = {}
+_models_lock = threading.Lock()
 
 def get_available_models(base_url: str = "http://localhost:11434") -> List[str]:
-    """Fetches the list of available models from an Ollama instance."""
+    """Fetches the list of available models from an Ollama instance, reusing it for MODELS_TTL seconds."""
+    base_url = base_url.rstrip('/')
+    with _models_lock:
+        cached = _models_cache.get(base_url)
+        if cached is not None and time.monotonic() - cached[0] < MODELS_TTL:
+            return list(cached[1])
     try:
-        response = requests.get(f"{base_url.rstrip('/')}/api/tags", timeout=5)
+        response = _probe_session_for(base_url).get(f"{base_url}/api/tags", timeout=5)
         if response.status_code == 200:
-            data = response.json()
-            return [model['name'] for model in data.get('models', [])]
-    except requests.RequestException:
+            data = orjson.loads(response.content)
+            models = [model['name'] for model in data.get('models', [])]
+            with _models_lock:
+                _models_cache[base_url] = (time.monotonic(), models)
+            return list(models)
+    except (requests.RequestException, ValueError):
         pass
     return []
 
+def model_speed_rank(name: str) -> float:
+    """
+    Estimates how fast a model tag runs; lower is faster. Small and 4/5-bit quantized
+    builds are favoured over full-precision or very large ones, e.g.
+    "llama3:8b-instruct-q4_K_M" ranks before "llama3:70b" or "llama3:8b-fp16".
+    """
+    tag = name.lower()
+    rank = 0.0
+
+    if re.search(r"q[45]_k_[ms]|q4_0|q4_1|q5_0|q5_1", tag):
+        rank -= 2
+    elif re.search(r"fp16|f16|fp32|f32|q8_0", tag):
+        rank += 3
+
+    # Mixture-of-experts tags such as "mixtral:8x7b" hold N experts of M billion parameters
+    size = re.search(r"(?:(\d+)x)?(\d+(?:\.\d+)?)b\b", tag)
+    if size:
+        billions = float(size.group(2)) * int(size.group(1) or 1)
+        if billions <= 3:
+            rank -= 2
+        elif billions <= 8:
+            rank -= 1
+        elif billions >= 30:
+            rank += 4
+        else:
+            rank += 1
+    return rank
+
+def create_session(pool_size: int = 16, retries: int = 2) -> requests.Session:
+    """
+    Creates an HTTP session that keeps up to `pool_size` connections per host alive between
+    calls, and retries failed connections and gateway errors (502/503/504) `retries` times.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=0.1, status_forcelist=[502, 503, 504]) if retries else 0
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@functools.lru_cache(maxsize=32)
+def _session_for(base_url: str) -> requests.Session:
+    """
+    One session per Ollama server for the whole process. Streamlit reruns and re-initialized
+    councils keep reusing the same pool, since this module is not re-imported on rerun.
+    """
+    return create_session()
+
+@functools.lru_cache(maxsize=32)
+def _probe_session_for(base_url: str) -> requests.Session:
+    """
+    Session for health pings and model lists. It never retries: urllib3 would repeat these
+    idempotent GETs on timeouts, multiplying the wait on a hung server.
+    """
+    return create_session(pool_size=4, retries=0)
+
+def format_conversation(query: str, history: List[Tuple[str, str]]) -> str:
+    """
+    Prepends previous (question, answer) turns to a follow-up query.
+
+    Earlier turns always come first and are rendered identically on every call, so
+    consecutive prompts of a conversation share a prefix that Ollama can reuse from
+    its KV cache instead of re-processing it.
+    """
+    if not history:
+        return query
+    turns = "".join(f"User: {q}\nCouncil: {a}\n\n" for q, a in history)
+    return f"Previous conversation:\n{turns}Follow-up question: {query}"
+
+def _iter_streaming_response(response: requests.Response) -> Iterator[str]:
+    """
+    Yields the text chunks of a streamed Ollama /api/generate response until it reports done.
+    Raises ValueError if Ollama reports an error mid-stream or the stream ends before done.
+    """
+    for line in response.iter_lines():
+        if not line:
+            continue
+        chunk = orjson.loads(line)
+        # Failures after streaming started arrive in-band, with HTTP 200
+        if chunk.get("error"):
+            raise ValueError(f"Ollama error: {chunk['error']}")
+        text = chunk.get("response", "")
+        if text:
+            yield text
+        if chunk.get("done"):
+            return
+    raise ValueError("Stream ended before the response was done")
+
+def _accumulate_streaming_response(response: requests.Response) -> str:
+    """Reads a streamed Ollama response to the end and returns the full text."""
+    buffer = io.StringIO()
+    for text in _iter_streaming_response(response):
+        buffer.write(text)
+    return buffer.getvalue()
+
+def _parse_reviews(raw_review: str, count: int) -> Dict[int, Tuple[float, str]]:
+    """Extracts {candidate_index: (score, critique)} from a JSON peer review, skipping malformed items."""
+    try:
+        items = json.loads(raw_review).get("reviews", [])
+    except (ValueError, AttributeError):
+        return {}
+
+    parsed = {}
+    for item in items if isinstance(items, list) else []:
+        try:
+            index = int(item["id"]) - 1
+            score = float(item["score"])
+            critique = str(item.get("critique", "")).strip()
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+        if 0 <= index < count and critique:
+            parsed[index] = (score, critique)
+    return parsed
+
+def _shorten(text: str, max_chars: int) -> str:
+    """Keeps the beginning and the end of a text longer than `max_chars`, where answers state and conclude."""
+    if len(text) <= max_chars:
+        return text
+    half = max_chars // 2
+    return f"{text[:half].rstrip()}\n[...]\n{text[-half:].lstrip()}"
+
+# Prompt templates. The fixed instructions come first and the query and answers last:
+# Ollama reuses the KV cache of a prompt prefix it already processed.
+_PEER_REVIEW_TMPL = (
+    "Task:\n"
+    "1. Evaluate each candidate answer to the query below based on accuracy and insight.\n"
+    "2. Give each one a score from 1 (poor) to 10 (excellent).\n"
+    "3. Provide a brief critique for each.\n"
+    "\n"
+    "Respond with JSON only, in this format:\n"
+    '{{"reviews": [{{"id": 1, "score": 8, "critique": "..."}}, ...]}}\n'
+    "\n"
+    "Original Query: {query}\n"
+    "\n"
+    "Here are {n} answers from other council members:\n"
+    "{candidates_text}\n"
+)
+
+_SYNTHESIZE_TMPL = (
+    "You are the Chairman of an AI Council.\n"
+    "\n"
+    "Your task:\n"
+    "1. Analyze the different perspectives provided by the council members below.\n"
+    "2. Weigh the arguments based on the peer reviews and your own judgment.\n"
+    "3. Synthesize a single, comprehensive, and accurate final answer to the user's query.\n"
+    '4. Do not explicitly mention "Member 1" or "Member 2" in the final output unless necessary for contrast. '
+    "Focus on the content.\n"
+    "\n"
+    'Original User Query: "{query}"\n'
+    "\n"
+    "Here are the opinions provided by the council members, along with peer reviews:\n"
+    "{context}\n"
+    "\n"
+    "Final Answer:\n"
+)
+
 @dataclass
 class Opinion:
     member_name: str
@@ -23,29 +208,63 @@ class Opinion:
     reviews: List[str] = field(default_factory=list)
     latency_ms: float = 0.0  # Response time in milliseconds
 
+# Statuses of members cut off from Stage 1 (deadline or early consensus) while still generating
+BUSY_STATUSES = ("timeout", "skipped")
+
+LATENCY_WINDOW = 256  # Number of recent successful requests averaged by PerformanceMetrics
+
 @dataclass
 class PerformanceMetrics:
     """Tracks performance metrics for each model."""
     name: str
     model: str
-    status: str = "unknown"  # online, offline, responding, error
+    status: str = "unknown"  # online, offline, responding, error, timeout, skipped
     latency_ms: float = 0.0
     last_ping_ms: float = 0.0
     total_requests: int = 0
     successful_requests: int = 0
-    avg_latency_ms: float = 0.0
+    in_flight: int = 0  # Requests sent to this node that have not completed yet
+    cache_hits: int = 0  # Requests answered from the prompt cache without calling the node
+    last_seen: float = 0.0  # time.monotonic() of the last successful ping or call
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    # Ring buffer of the latest successful latencies: fixed memory, O(1) insert
+    _latencies: np.ndarray = field(default_factory=lambda: np.zeros(LATENCY_WINDOW, dtype=np.float32),
+                                   repr=False, compare=False)
+    
+    @contextlib.contextmanager
+    def track_request(self):
+        """Counts a request as in flight for the duration of the `with` block."""
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
     
     def update_latency(self, latency_ms: float, success: bool = True):
-        """Update running average of latency."""
-        self.total_requests += 1
-        if success:
-            self.successful_requests += 1
-            # Running average
-            self.avg_latency_ms = (
-                (self.avg_latency_ms * (self.successful_requests - 1) + latency_ms) 
-                / self.successful_requests
-            )
-        self.latency_ms = latency_ms
+        """Record the outcome of a request; successful latencies feed the rolling average."""
+        # Concurrent calls on the same node (e.g. a review starting while its opinion is
+        # still being recorded) must not claim the same ring buffer slot
+        with self._lock:
+            self.total_requests += 1
+            if success:
+                self._latencies[self.successful_requests % LATENCY_WINDOW] = latency_ms
+                self.successful_requests += 1
+            self.latency_ms = latency_ms
+
+    def record_cache_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+    
+    @property
+    def avg_latency_ms(self) -> float:
+        """Average latency over the last LATENCY_WINDOW successful requests."""
+        with self._lock:
+            count = min(self.successful_requests, LATENCY_WINDOW)
+            if count == 0:
+                return 0.0
+            return float(self._latencies[:count].mean())
     
     @property
     def success_rate(self) -> float:
@@ -54,209 +273,829 @@ class PerformanceMetrics:
         return (self.successful_requests / self.total_requests) * 100
 
 class CouncilMember:
-    def __init__(self, name: str, base_url: str, model: str):
+    # System prompts never change between calls: Ollama places them before the prompt, so
+    # they are the start of the prefix whose KV cache the server can reuse.
+    OPINION_SYSTEM_PROMPT = "You are a helpful expert assistant. Provide a concise and accurate answer."
+    REVIEW_SYSTEM_PROMPT = "You are a critical peer reviewer. Be objective."
+    # Generation caps per stage, passed as Ollama options
+    OPINION_OPTIONS = {"num_predict": 512}
+    REVIEW_OPTIONS = {"num_predict": 384}
+
+    def __init__(self, name: str, base_url: str, model: str, session: Optional[requests.Session] = None,
+                 cache: Optional[PromptCache] = None, num_ctx: int = 4096):
         self.name = name
         self.base_url = base_url.rstrip('/')
         self.model = model
+        self.session = session or _session_for(self.base_url)
+        self._owns_session = session is not None  # The process-wide _session_for pools are never closed
+        self.cache = cache
         self.timeout = 600  # Increased timeout for longer generations
+        self.ping_timeout = 1.0  # Health checks must fail fast on unreachable nodes (a LAN round trip is a few ms)
+        self.keep_alive = "30m"  # How long Ollama keeps the model loaded after a call
+        # Context window for every call of this node: Ollama reloads the model when num_ctx changes,
+        # so all stages (and the warm-up) must use the same value
+        self.num_ctx = num_ctx
+        self.review_max_chars = 2000  # Longer answers are shortened in this node's review prompts
+        self.slot: Optional[threading.BoundedSemaphore] = None  # Caps concurrent calls to this node's server
         self.metrics = PerformanceMetrics(name=name, model=model)
 
     def is_alive(self) -> Tuple[bool, float]:
         """Check if the Ollama instance is reachable. Returns (status, latency_ms)."""
         try:
-            start_time = time.time()
-            response = requests.get(f"{self.base_url}/", timeout=5)
-            latency_ms = (time.time() - start_time) * 1000
+            start_time = time.perf_counter_ns()
+            response = _probe_session_for(self.base_url).get(f"{self.base_url}/", timeout=self.ping_timeout)
+            latency_ms = (time.perf_counter_ns() - start_time) / 1e6
             
             is_online = response.status_code == 200
             self.metrics.status = "online" if is_online else "error"
+            if is_online:
+                self.metrics.last_seen = time.monotonic()
             self.metrics.last_ping_ms = latency_ms
             return is_online, latency_ms
         except requests.RequestException:
             self.metrics.status = "offline"
             return False, 0.0
 
-    def generate(self, prompt: str, system_prompt: str = "") -> Tuple[Optional[str], float]:
-        """Generates a response from the local Ollama instance. Returns (response, latency_ms)."""
-        url = f"{self.base_url}/api/generate"
-        payload = {
+    def _server_slot(self):
+        """Context manager waiting for a free request slot on this node's server, if one is configured."""
+        return self.slot if self.slot is not None else contextlib.nullcontext()
+
+    def close(self):
+        """
+        Releases the idle connections of a session this node was given (it stays usable and
+        reconnects on demand). The shared per-server pools stay open for other councils.
+        """
+        if self._owns_session:
+            self.session.close()
+
+    def _post(self, path: str, payload: Dict, **kwargs) -> requests.Response:
+        """POSTs `payload` to this node's API, serialized with orjson (prompts carry every opinion and review)."""
+        return self.session.post(f"{self.base_url}{path}", data=orjson.dumps(payload),
+                                 headers={"Content-Type": "application/json"}, **kwargs)
+
+    def warm_up(self) -> bool:
+        """Loads the model into memory without generating anything, so the first real call skips the cold start."""
+        try:
+            response = self._post(
+                "/api/generate",
+                {"model": self.model, "prompt": "", "keep_alive": self.keep_alive, "options": {"num_ctx": self.num_ctx}},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            return True
+        except requests.RequestException as e:
+            print(f"Could not warm up {self.model} on {self.base_url}: {e}")
+            return False
+
+    def _cached_response(self, prompt: str, system_prompt: str, cacheable: bool) -> Tuple[Optional[str], Optional[str]]:
+        """Returns (cache_key, cached_response); the key is None when the call must not use the cache."""
+        if self.cache is None or not cacheable:
+            return None, None
+        cache_key = PromptCache.make_key(self.model, system_prompt, prompt)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.metrics.record_cache_hit()
+        return cache_key, cached
+
+    def _payload(self, prompt: str, system_prompt: str, options: Optional[Dict],
+                 keep_alive: Optional[str]) -> Dict:
+        return {
             "model": self.model,
             "prompt": prompt,
             "system": system_prompt,
-            "stream": False
+            # Streaming keeps the connection active while tokens are produced, avoiding
+            # Ollama stalls on long non-streamed generations
+            "stream": True,
+            "keep_alive": keep_alive or self.keep_alive,
+            "options": {"num_ctx": self.num_ctx, **(options or {})}
         }
+
+    def generate(self, prompt: str, system_prompt: str = "", format: Optional[str] = None,
+                 cacheable: bool = True, options: Optional[Dict] = None,
+                 keep_alive: Optional[str] = None) -> Tuple[Optional[str], float]:
+        """
+        Generates a response from the local Ollama instance. Returns (response, latency_ms).
+        Pass format="json" to constrain the output to valid JSON, and cacheable=False to
+        always get a fresh answer. `options` (e.g. num_predict) and `keep_alive` are
+        forwarded to Ollama.
+        """
+        cache_key, cached = self._cached_response(prompt, system_prompt, cacheable)
+        if cached is not None:
+            return cached, 0.0
+
+        payload = self._payload(prompt, system_prompt, options, keep_alive)
+        if format:
+            payload["format"] = format
         
         self.metrics.status = "responding"
-        start_time = time.time()
         
         try:
-            response = requests.post(url, json=payload, timeout=self.timeout)
-            latency_ms = (time.time() - start_time) * 1000
-            response.raise_for_status()
+            with self.metrics.track_request(), self._server_slot():
+                start_time = time.perf_counter_ns()
+                with self._post("/api/generate", payload, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    text = _accumulate_streaming_response(response)
+                latency_ms = (time.perf_counter_ns() - start_time) / 1e6
             
             self.metrics.update_latency(latency_ms, success=True)
             self.metrics.status = "online"
+            self.metrics.last_seen = time.monotonic()
             
-            return response.json().get("response", ""), latency_ms
-        except requests.RequestException as e:
-            latency_ms = (time.time() - start_time) * 1000
+            if cache_key is not None and text:
+                self.cache.set(cache_key, text)
+            return text, latency_ms
+        except (requests.RequestException, ValueError) as e:
+            latency_ms = (time.perf_counter_ns() - start_time) / 1e6
             self.metrics.update_latency(latency_ms, success=False)
             self.metrics.status = "error"
             print(f"Error communicating with {self.name} ({self.base_url}): {e}")
             return None, latency_ms
 
+    def generate_stream(self, prompt: str, system_prompt: str = "", cacheable: bool = True,
+                        options: Optional[Dict] = None, keep_alive: Optional[str] = None) -> Iterator[str]:
+        """
+        Streams a response from the Ollama instance, yielding text chunks as soon as they are decoded.
+        A failure, even after some chunks were yielded, is re-raised so the caller does not take a
+        truncated answer for a complete one.
+        """
+        cache_key, cached = self._cached_response(prompt, system_prompt, cacheable)
+        if cached is not None:
+            yield cached
+            return
+
+        payload = self._payload(prompt, system_prompt, options, keep_alive)
+
+        self.metrics.status = "responding"
+        parts = []
+
+        try:
+            with self.metrics.track_request(), self._server_slot():
+                start_time = time.perf_counter_ns()
+                with self._post("/api/generate", payload, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    for text in _iter_streaming_response(response):
+                        parts.append(text)
+                        yield text
+        except (requests.RequestException, ValueError) as e:
+            latency_ms = (time.perf_counter_ns() - start_time) / 1e6
+            self.metrics.update_latency(latency_ms, success=False)
+            self.metrics.status = "error"
+            print(f"Error communicating with {self.name} ({self.base_url}): {e}")
+            raise
+
+        latency_ms = (time.perf_counter_ns() - start_time) / 1e6
+        self.metrics.update_latency(latency_ms, success=True)
+        self.metrics.status = "online"
+        self.metrics.last_seen = time.monotonic()
+        if cache_key is not None and parts:
+            self.cache.set(cache_key, "".join(parts))
+
+    def _critique_key(self, query: str, candidate: Opinion) -> str:
+        """Identifies this reviewer's critique of one answer to one query."""
+        return PromptCache.make_key(self.model, f"review\0{query}", candidate.content)
+
+    def _cached_critiques(self, query: str, candidates: List[Opinion]) -> Dict[int, Tuple[float, str]]:
+        """Returns the critiques this reviewer already wrote for some of the candidates."""
+        known = {}
+        if self.cache is None:
+            return known
+        for i, op in enumerate(candidates):
+            cached = self.cache.get(self._critique_key(query, op))
+            if cached is None:
+                continue
+            try:
+                entry = json.loads(cached)
+                known[i] = (float(entry["score"]), str(entry["critique"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+        return known
+
+    def review_all(self, query: str, candidates: List[Opinion]) -> Tuple[Optional[str], Dict[int, Tuple[float, str]]]:
+        """
+        Stage 2: Scores and critiques all candidate answers in a single call.
+        Returns (raw_review, {candidate_index: (score, critique)}); the dict only holds
+        the critiques that could be parsed or were cached.
+
+        Answers this reviewer already critiqued for the same query are taken from the
+        prompt cache, so only the new ones are sent to the model.
+        """
+        known = self._cached_critiques(query, candidates)
+        missing = [i for i in range(len(candidates)) if i not in known]
+        if not missing:
+            self.metrics.record_cache_hit()
+            reviews = [{"id": i + 1, "score": score, "critique": critique} for i, (score, critique) in known.items()]
+            return json.dumps({"reviews": reviews}), known
+
+        candidates_text = "".join(
+            f"\n[Candidate Answer {position+1}]\n{_shorten(candidates[i].content, self.review_max_chars)}\n"
+            for position, i in enumerate(missing)
+        )
+
+        prompt = _PEER_REVIEW_TMPL.format(n=len(missing), query=query, candidates_text=candidates_text)
+
+        raw_review, latency = self.generate(prompt, system_prompt=self.REVIEW_SYSTEM_PROMPT, format="json",
+                                            options=self.REVIEW_OPTIONS)
+        if not raw_review:
+            # The critiques already known stay usable when the call for the others fails
+            return None, known
+        parsed = dict(known)
+        for position, (score, critique) in _parse_reviews(raw_review, len(missing)).items():
+            i = missing[position]
+            parsed[i] = (score, critique)
+            if self.cache is not None:
+                self.cache.set(self._critique_key(query, candidates[i]), json.dumps({"score": score, "critique": critique}))
+        return raw_review, parsed
+
+    def embed(self, text: str) -> Optional[List[float]]:
+        """Returns the embedding of `text` computed by this node's model, or None on failure."""
+        try:
+            response = self._post(
+                "/api/embed",
+                {"model": self.model, "input": text},
+                timeout=30
+            )
+            response.raise_for_status()
+            embeddings = orjson.loads(response.content).get("embeddings") or [None]
+            return embeddings[0]
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error computing embedding with {self.name} ({self.base_url}): {e}")
+            return None
+
 class Chairman(CouncilMember):
-    def synthesize(self, query: str, opinions: List[Opinion]) -> Tuple[str, float]:
-        """Stage 3: Synthesize all opinions and reviews into a final answer. Returns (answer, latency_ms)."""
+    SYSTEM_PROMPT = "You are a wise and judicious Chairman synthesizing multiple expert opinions."
+    SYNTHESIS_OPTIONS = {"num_predict": 1024}
+    acting_for: Optional[str] = None  # Name of the member this Chairman stands in for, if any
+
+    @classmethod
+    def from_member(cls, member: CouncilMember) -> "Chairman":
+        """Lets a council member act as Chairman, sharing its connection, cache, server slots and metrics."""
+        chairman = cls(name=f"{member.name} (acting Chairman)", base_url=member.base_url, model=member.model,
+                       session=member.session, cache=member.cache, num_ctx=member.num_ctx)
+        chairman.slot = member.slot
+        chairman.metrics = member.metrics
+        chairman.acting_for = member.name
+        chairman._owns_session = member._owns_session  # The member's session may be a shared pool
+        return chairman
+
+    def _build_prompt(self, query: str, opinions: List[Opinion], general_reviews: Optional[Dict[str, str]] = None) -> str:
+        """Builds the Stage 3 prompt from all opinions, their reviews and reviews covering all of them."""
         
         # Construct the context from all opinions and their reviews
-        context = ""
+        parts = []
         for i, op in enumerate(opinions):
-            context += f"\n--- Opinion {i+1} (from {op.member_name}) ---\n"
-            context += f"{op.content}\n"
+            parts.append(f"\n--- Opinion {i+1} (from {op.member_name}) ---\n")
+            parts.append(f"{op.content}\n")
             if op.reviews:
-                context += "  Peer Reviews:\n"
-                for rev in op.reviews:
-                    context += f"  - {rev}\n"
-        
-        prompt = f"""
-        You are the Chairman of an AI Council. 
-        
-        Original User Query: "{query}"
-        
-        Here are the opinions provided by the council members, along with peer reviews:
-        {context}
-        
-        Your task:
-        1. Analyze the different perspectives provided.
-        2. Weigh the arguments based on the peer reviews and your own judgment.
-        3. Synthesize a single, comprehensive, and accurate final answer to the user's query.
-        4. Do not explicitly mention "Member 1" or "Member 2" in the final output unless necessary for contrast. Focus on the content.
-        
-        Final Answer:
+                parts.append("  Peer Reviews:\n")
+                parts.extend(f"  - {rev}\n" for rev in op.reviews)
+        if general_reviews:
+            parts.append("\n--- Reviews covering several opinions ---\n")
+            parts.extend(f"  - Review by {name}:\n{review}\n" for name, review in general_reviews.items())
+        context = "".join(parts)
+        return _SYNTHESIZE_TMPL.format(query=query, context=context)
+
+    def _synthesis_key(self, query: str, opinions: List[Opinion], general_reviews: Optional[Dict[str, str]]) -> str:
+        """Prompt cache key of a synthesis, hashing everything it depends on without formatting the prompt."""
+        context = [query, [(op.member_name, op.content, op.reviews) for op in opinions], general_reviews or {}]
+        ctx_key = hashlib.blake2b(orjson.dumps(context, option=orjson.OPT_SORT_KEYS), digest_size=32).hexdigest()
+        return PromptCache.make_key(self.model, self.SYSTEM_PROMPT, f"synthesis\0{ctx_key}")
+
+    def _cached_synthesis(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.metrics.record_cache_hit()
+        return cached
+
+    def synthesize(self, query: str, opinions: List[Opinion],
+                   general_reviews: Optional[Dict[str, str]] = None) -> Tuple[Optional[str], float]:
         """
-        
-        response, latency = self.generate(prompt, system_prompt="You are a wise and judicious Chairman synthesizing multiple expert opinions.")
-        return response or "Failed to generate synthesis.", latency
+        Stage 3: Synthesize all opinions and reviews into a final answer. Returns (answer, latency_ms),
+        with answer None if the call failed. With a prompt cache, unchanged inputs return the previous synthesis.
+        """
+        key = self._synthesis_key(query, opinions, general_reviews) if self.cache is not None else None
+        cached = self._cached_synthesis(key)
+        if cached is not None:
+            return cached, 0.0
+
+        prompt = self._build_prompt(query, opinions, general_reviews)
+        # Cached under the context key above, not under the full prompt as well
+        response, latency = self.generate(prompt, system_prompt=self.SYSTEM_PROMPT, cacheable=False,
+                                          options=self.SYNTHESIS_OPTIONS)
+        if not response:
+            return None, latency
+        if key is not None:
+            self.cache.set(key, response)
+        return response, latency
+
+    def synthesize_stream(self, query: str, opinions: List[Opinion],
+                          general_reviews: Optional[Dict[str, str]] = None) -> Iterator[str]:
+        """Stage 3, streamed: yields the final answer chunk by chunk as the Chairman writes it."""
+        key = self._synthesis_key(query, opinions, general_reviews) if self.cache is not None else None
+        cached = self._cached_synthesis(key)
+        if cached is not None:
+            yield cached
+            return
+
+        prompt = self._build_prompt(query, opinions, general_reviews)
+        parts = []
+        for chunk in self.generate_stream(prompt, system_prompt=self.SYSTEM_PROMPT, cacheable=False,
+                                          options=self.SYNTHESIS_OPTIONS):
+            parts.append(chunk)
+            yield chunk
+        # generate_stream raises on failure, so reaching this point means the answer is complete
+        if key is not None and parts:
+            self.cache.set(key, "".join(parts))
 
 class CouncilOrchestrator:
-    def __init__(self, members: List[CouncilMember], chairman: Chairman):
+    def __init__(self, members: List[CouncilMember], chairman: Chairman, session: Optional[requests.Session] = None,
+                 semantic_cache: Optional[SemanticCache] = None, prompt_cache: Optional[PromptCache] = None,
+                 num_parallel: Optional[int] = None, embed_fn: Optional[Callable[[str], Optional[List[float]]]] = None,
+                 consensus_threshold: float = 0.9, stage_timeout: Optional[float] = None,
+                 backup_chairmen: Optional[List[Chairman]] = None, hedge_factor: float = 2.0,
+                 health_ttl: float = 5.0, single_reviewer: bool = False):
         self.members = members
         self.chairman = chairman
+        self._healthy: Optional[set] = None  # Names of reachable nodes at the last health check
+        self.health_ttl = health_ttl  # Seconds a health check result is reused
+        self._health: Optional[Tuple[float, Dict[str, bool]]] = None  # (checked at, results)
+        self._health_lock = threading.Lock()
+        self.semantic_cache = semantic_cache
+        # Stage 1 stops early once a majority of opinions agree (needs embeddings)
+        self.embed_fn = embed_fn
+        self.consensus_threshold = consensus_threshold
+        # Seconds Stages 1 and 2 wait for their slowest node before going on without it (None: no limit)
+        self.stage_timeout = stage_timeout
+        # Never send a server more concurrent requests than it serves in parallel (OLLAMA_NUM_PARALLEL):
+        # the extra ones would only queue there and slow down the others.
+        self.num_parallel = num_parallel or int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+        slots = {}
+        for node in self.members + [self.chairman]:
+            # Nodes use the per-server pools of _session_for unless a session is injected
+            if session is not None:
+                node.session = session
+                node._owns_session = True
+            if prompt_cache is not None:
+                node.cache = prompt_cache
+            node.slot = slots.setdefault(node.base_url, threading.BoundedSemaphore(self.num_parallel))
+
+        # Members running the Chairman's model on another server can stand in for it when they are faster
+        self.chairman_candidates = [self.chairman] + [
+            Chairman.from_member(m) for m in self.members
+            if m.model == self.chairman.model and m.base_url != self.chairman.base_url
+        ] + list(backup_chairmen or [])
+        # A second candidate is asked to synthesize when the first takes hedge_factor x its average latency
+        self.hedge_factor = hedge_factor
+        # Stage 2 as one call in which the Chairman reviews every opinion, instead of one call per member
+        self.single_reviewer = single_reviewer
+        # Unstructured reviews of the last Stage 2, by reviewer name, shown to the Chairman once
+        self.general_reviews: Dict[str, str] = {}
+
+        # One pool for every stage, so no query pays for creating threads. Sized for Stage 1
+        # and pipelined reviews in flight together, plus a health check.
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(8, 2 * len(self.members) + 2),
+                                                           thread_name_prefix="council")
+
+    def check_health(self, force: bool = False) -> Dict[str, bool]:
+        """
+        Checks the availability of all members and chairman. A result less than
+        `health_ttl` seconds old is returned as is unless `force` is set, and only
+        nodes without a successful ping or call in that window are pinged.
+        """
+        with self._health_lock:
+            if not force and self._health is not None and time.monotonic() - self._health[0] < self.health_ttl:
+                return dict(self._health[1])
 
-    def check_health(self) -> Dict[str, bool]:
-        """Pings all members and chairman to check availability."""
         results = {}
         all_nodes = self.members + [self.chairman]
+        now = time.monotonic()
+        to_ping = []
+        for node in all_nodes:
+            # A node that just answered a real call is known to be up
+            if (not force and node.metrics.status in ("online", "responding")
+                    and now - node.metrics.last_seen < self.health_ttl):
+                results[node.name] = True
+            else:
+                to_ping.append(node)
         
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future_to_node = {executor.submit(n.is_alive): n for n in all_nodes}
-            for future in concurrent.futures.as_completed(future_to_node):
-                node = future_to_node[future]
-                try:
-                    is_alive, latency = future.result()
-                    results[node.name] = is_alive
-                except Exception:
-                    results[node.name] = False
+        # Ping every node at once: the check takes as long as the slowest node, not the sum
+        future_to_node = {self._pool.submit(n.is_alive): n for n in to_ping}
+        for future in concurrent.futures.as_completed(future_to_node):
+            node = future_to_node[future]
+            try:
+                is_alive, latency = future.result()
+                results[node.name] = is_alive
+            except Exception:
+                results[node.name] = False
+        self._healthy = {name for name, ok in results.items() if ok}
+        with self._health_lock:
+            self._health = (time.monotonic(), dict(results))
         return results
+
+    def active_members(self) -> List[CouncilMember]:
+        """Members that answered the last health check (all of them before the first check)."""
+        if self._healthy is None:
+            return list(self.members)
+        return [m for m in self.members if m.name in self._healthy]
+    
+    def warm_up(self):
+        """Loads every distinct (server, model) pair of the council concurrently, skipping offline nodes."""
+        nodes = {}
+        for node in self.members + [self.chairman]:
+            if node.metrics.status != "offline":
+                nodes.setdefault((node.base_url, node.model), node)
+        if not nodes:
+            return
+
+        list(self._pool.map(lambda n: n.warm_up(), nodes.values()))
+    
+    def close(self):
+        """Releases the threads and connections held by the council. Call it when the council is discarded."""
+        # Do not block on calls still running for a discarded council; they finish in the background
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        sessions = {id(node.session): node for node in self.members + [self.chairman]}
+        for node in sessions.values():
+            node.close()
+
+    def _ranked_chairmen(self) -> List[Chairman]:
+        """
+        Reachable Chairman candidates, the one expected to answer first at the front. Candidates
+        without a latency history are assumed to be as fast as the average measured one; ties
+        keep the configured order (the dedicated Chairman first). Candidates whose last call
+        failed come last rather than being dropped, since nothing pings them again.
+        """
+        reachable = [c for c in self.chairman_candidates if c.metrics.status not in ("offline",) + BUSY_STATUSES]
+        measured = [c.metrics.avg_latency_ms for c in reachable if c.metrics.successful_requests]
+        prior = sum(measured) / len(measured) if measured else 0.0
+
+        def expected_latency(c: Chairman) -> Tuple[bool, float]:
+            latency = c.metrics.avg_latency_ms if c.metrics.successful_requests else prior
+            return c.metrics.status == "error", latency * (1 + c.metrics.in_flight)
+
+        return sorted(reachable, key=expected_latency)
+
+    def pick_chairman(self) -> Optional[Chairman]:
+        """
+        Returns the healthy Chairman candidate expected to answer first, i.e. with the lowest
+        average latency scaled by the requests it is already serving. None if all are down.
+        """
+        ranked = self._ranked_chairmen()
+        return ranked[0] if ranked else None
+
+    def chairman_available(self) -> bool:
+        """Whether a Chairman candidate answered the last health check (True before the first check)."""
+        if self._healthy is None:
+            return True
+        for c in self.chairman_candidates:
+            if c.acting_for is not None:
+                if c.acting_for in self._healthy:
+                    return True
+            elif c.name in self._healthy or (c is not self.chairman and c.metrics.status != "offline"):
+                # Backup Chairmen are not part of the health check
+                return True
+        return False
+
+    def _hedged_synthesize(self, query: str, opinions: List[Opinion]) -> Tuple[Optional[str], float]:
+        """
+        Asks the best Chairman candidate to synthesize and, if it is still working after
+        hedge_factor x its average latency or failed, the next one too. The first success
+        wins; the other call is left to finish and fill the prompt cache. Returns
+        (answer, latency_ms), with answer None if every candidate asked failed.
+        """
+        ranked = self._ranked_chairmen() or [self.chairman]
+        backups = iter(ranked[1:])
+        future_to_chairman = {}
+
+        def ask(chairman: Chairman) -> concurrent.futures.Future:
+            future = self._pool.submit(chairman.synthesize, query, opinions, self.general_reviews)
+            future_to_chairman[future] = chairman
+            return future
+
+        primary = ranked[0]
+        ask(primary)
+        hedge_delay = self.hedge_factor * primary.metrics.avg_latency_ms / 1000
+        if len(ranked) > 1 and hedge_delay > 0:
+            done, _ = concurrent.futures.wait(future_to_chairman, timeout=hedge_delay)
+            if not done:
+                print(f"{primary.name} is slower than usual, also asking {ranked[1].name}.")
+                ask(next(backups))
+
+        pending = set(future_to_chairman)
+        result = (None, 0.0)
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                chairman = future_to_chairman[future]
+                result = future.result()
+                if result[0] is not None:
+                    return result
+                # Failed: unless another candidate is already working, fall back on the next one
+                backup = None if pending else next(backups, None)
+                if backup is not None:
+                    print(f"{chairman.name} failed to synthesize, asking {backup.name}.")
+                    pending.add(ask(backup))
+        return result
     
     def get_all_metrics(self) -> List[PerformanceMetrics]:
         """Returns performance metrics for all nodes (members + chairman)."""
         return [m.metrics for m in self.members] + [self.chairman.metrics]
 
-    def gather_opinions(self, query: str) -> List[Opinion]:
-        """Stage 1: Ask all members for their initial opinion."""
-        opinions = []
+    def _council_signature(self) -> List[str]:
+        """Identifies the council composition so cached runs are only reused by the same council."""
+        return [m.name for m in self.members] + [self.chairman.name]
+
+    def _cached_run(self, query: str) -> Optional[Dict]:
+        if self.semantic_cache is None:
+            return None
+        return self.semantic_cache.lookup(query, self._council_signature())
+
+    def gather_opinions(self, query: str,
+                        on_result: Optional[Callable[[CouncilMember, Optional[Opinion]], None]] = None) -> List[Opinion]:
+        """
+        Stage 1: Ask all members for their initial opinion.
+        `on_result` is called in the calling thread as each member answers (None if it failed).
+        Opinions are returned in the order of the members, whatever order they arrived in.
+        """
+
+        cached = self._cached_run(query)
+        if cached:
+            print(f"--- Stage 1: Reusing cached opinions for '{query}' ---")
+            return [Opinion(member_name=op["member_name"], content=op["content"]) for op in cached["opinions"]]
         
         def ask_member(member: CouncilMember):
-            response, latency = member.generate(query, system_prompt="You are a helpful expert assistant. Provide a concise and accurate answer.")
+            response, latency = member.generate(query, system_prompt=member.OPINION_SYSTEM_PROMPT,
+                                                options=member.OPINION_OPTIONS)
             if response:
                 return Opinion(member_name=member.name, content=response, latency_ms=latency)
             return None
 
         print(f"--- Stage 1: Gathering Opinions on '{query}' ---")
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future_to_member = {executor.submit(ask_member, m): m for m in self.members}
-            for future in concurrent.futures.as_completed(future_to_member):
+        members = self.active_members()
+        if not members:
+            return []
+
+        # One slot per member: a stable order keeps later prompts, and so their cached prefixes, identical
+        slots: List[Optional[Opinion]] = [None] * len(members)
+        # Every request is in flight at once: Stage 1 then costs max(latency) instead of sum(latency).
+        future_to_member = {self._pool.submit(ask_member, m): m for m in members}
+        future_to_index = {future: i for i, future in enumerate(future_to_member)}
+        try:
+            embeddings = []
+            for done_count, future in enumerate(self._as_completed(future_to_member, "Stage 1"), start=1):
                 result = future.result()
-                if result:
-                    opinions.append(result)
+                slots[future_to_index[future]] = result
+                consensus = (result is not None and done_count < len(members)
+                             and self._has_consensus(result, embeddings, len(members)))
+                if consensus:
+                    print(f"Consensus reached with {sum(op is not None for op in slots)} opinions, not waiting for the others.")
+                    # Still generating their dropped answer: keep them out of Stage 2 as well. Marked
+                    # before on_result, which may start reviews.
+                    for other, member in future_to_member.items():
+                        if not other.done():
+                            member.metrics.status = "skipped"
+                if on_result is not None:
+                    on_result(future_to_member[future], result)
+                if consensus:
+                    break
+        finally:
+            # Do not wait for members still generating once we stopped listening to them
+            for future in future_to_member:
+                future.cancel()
         
-        return opinions
+        return [op for op in slots if op is not None]
+
+    def _as_completed(self, future_to_node: Dict[concurrent.futures.Future, CouncilMember],
+                      stage: str) -> Iterator[concurrent.futures.Future]:
+        """
+        Yields futures as they complete until `stage_timeout` expires, then marks the nodes
+        still running as "timeout" and stops, so one hung server cannot stall the stage.
+        """
+        try:
+            yield from concurrent.futures.as_completed(future_to_node, timeout=self.stage_timeout)
+        except concurrent.futures.TimeoutError:
+            late = [node for future, node in future_to_node.items() if not future.done()]
+            for node in late:
+                node.metrics.status = "timeout"
+            print(f"{stage} deadline of {self.stage_timeout}s reached, going on without: "
+                  f"{', '.join(node.name for node in late)}")
+
+    def _has_consensus(self, opinion: Opinion, embeddings: List[List[float]], council_size: int) -> bool:
+        """
+        Records the embedding of a newly arrived opinion and tells whether a majority
+        (at least two) of the council now gave answers similar to one of the opinions.
+        """
+        if self.embed_fn is None:
+            return False
+        vector = self.embed_fn(opinion.content)
+        if not vector:
+            return False
+        embeddings.append(vector)
+
+        needed = max(2, math.ceil(council_size / 2))
+        if len(embeddings) < needed:
+            return False
+        for candidate in embeddings:
+            agreeing = sum(1 for other in embeddings if cosine_similarity(candidate, other) >= self.consensus_threshold)
+            if agreeing >= needed:  # Includes the candidate itself
+                return True
+        return False
 
 
     def peer_review(self, query: str, opinions: List[Opinion]) -> List[Opinion]:
         """Stage 2: Members review each other's answers anonymously."""
         print("--- Stage 2: Peer Review ---")
+        self.general_reviews = {}
         
         if len(opinions) < 2:
             print("Not enough opinions for peer review.")
             return opinions
 
+        cached = self._cached_run(query)
+        if cached:
+            cached_opinions = {op["member_name"]: op for op in cached["opinions"]}
+            if all(op.member_name in cached_opinions for op in opinions):
+                for op in opinions:
+                    op.reviews = list(cached_opinions[op.member_name]["reviews"])
+                    op.score = cached_opinions[op.member_name]["score"]
+                return opinions
+
         review_tasks = []
         
-        # Each member reviews ALL other opinions
-        for reviewer in self.members:
+        if self.single_reviewer:
+            # One reviewer reads every opinion once; a member acting as Chairman skips its own
+            reviewer = self.pick_chairman() or self.chairman
+            candidates = [op for op in opinions if op.member_name != reviewer.acting_for]
+            if candidates:
+                review_tasks.append((reviewer, candidates))
+
+        # Otherwise each member reviews ALL other opinions
+        for reviewer in [] if self.single_reviewer else self.active_members():
             # Filter out opinions written by the reviewer (if they are in the opinions list)
             # Note: In a distributed system, 'reviewer' object is distinct. We match by name.
             others_opinions = [op for op in opinions if op.member_name != reviewer.name]
             
-            if not others_opinions:
-                continue
-            
-            candidates_text = ""
-            for i, op in enumerate(others_opinions):
-                candidates_text += f"\n[Candidate Answer {i+1}]\n{op.content}\n"
+            if others_opinions and reviewer.metrics.status not in BUSY_STATUSES:
+                review_tasks.append((reviewer, others_opinions))
 
-            prompt = f"""
-            Original Query: {query}
-            
-            Here are {len(others_opinions)} answers from other council members:
-            {candidates_text}
-            
-            Task:
-            1. Evaluate each candidate answer based on accuracy and insight.
-            2. Rank them from best to worst.
-            3. Provide a brief critique for each.
-            
-            Format your response as:
-            Rank 1: [Candidate Answer X] - [Critique]
-            Rank 2: [Candidate Answer Y] - [Critique]
-            ...
-            """
-            
-            review_tasks.append((reviewer, prompt))
-
-        def perform_review(task):
-            reviewer, prompt = task
-            review_text, latency = reviewer.generate(prompt, system_prompt="You are a critical peer reviewer. Be objective.")
-            return (reviewer.name, review_text)
-
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = [executor.submit(perform_review, t) for t in review_tasks]
-            for future in concurrent.futures.as_completed(futures):
-                reviewer_name, review_text = future.result()
-                if review_text:
-                    
-                    for op in opinions:
-                        if op.member_name != reviewer_name:
-                            op.reviews.append(f"Review by {reviewer_name}:\n{review_text}")
-        
+        if not review_tasks:
+            return opinions
+
+        # All reviews go out in a single wave.
+        futures = {self._pool.submit(self._perform_review, query, reviewer, others): reviewer
+                   for reviewer, others in review_tasks}
+        try:
+            results = [future.result() for future in self._as_completed(futures, "Stage 2")]
+        finally:
+            for future in futures:
+                future.cancel()
+
+        self._attach_reviews(opinions, results)
         return opinions
 
+    def gather_and_review(self, query: str,
+                          on_opinions: Optional[Callable[[List[Opinion]], None]] = None) -> List[Opinion]:
+        """
+        Stages 1 and 2 pipelined: each member starts its review as soon as the opinions of all
+        the other members are in, instead of every reviewer waiting for the slowest member.
+        `on_opinions` receives the Stage 1 result (in the calling thread) while reviews are
+        still running. Returns the reviewed opinions.
+        """
+        if self.single_reviewer or self._cached_run(query):
+            # A single review needs every opinion, so there is nothing to overlap with Stage 1
+            opinions = self.gather_opinions(query)
+            if on_opinions is not None:
+                on_opinions(opinions)
+            return self.peer_review(query, opinions)
+
+        self.general_reviews = {}
+        members = self.active_members()
+        not_reviewing = {m.name: m for m in members}
+        outstanding = {m.name for m in members}  # Members whose opinion has not arrived yet
+        arrived: Dict[str, Opinion] = {}
+        review_futures: Dict[concurrent.futures.Future, CouncilMember] = {}
+
+        def start_ready_reviews():
+            for name, reviewer in list(not_reviewing.items()):
+                # A reviewer only needs the answers of the others
+                if outstanding - {name}:
+                    continue
+                del not_reviewing[name]
+                others = [arrived[m.name] for m in members if m.name in arrived and m.name != name]
+                # A member cut off from Stage 1 (deadline or consensus) is still busy generating
+                if others and reviewer.metrics.status not in BUSY_STATUSES:
+                    review_futures[self._pool.submit(self._perform_review, query, reviewer, others)] = reviewer
+
+        def on_result(member: CouncilMember, opinion: Optional[Opinion]):
+            outstanding.discard(member.name)
+            if opinion:
+                arrived[member.name] = opinion
+            start_ready_reviews()
+
+        try:
+            opinions = self.gather_opinions(query, on_result=on_result)
+            if on_opinions is not None:
+                on_opinions(opinions)
+
+            print("--- Stage 2: Peer Review ---")
+            if len(opinions) < 2:
+                print("Not enough opinions for peer review.")
+                return opinions
+
+            # The slowest member's review may have started before the deadline cut it off: it is
+            # queued behind its own hung generation, so do not wait for it
+            for future, reviewer in list(review_futures.items()):
+                if reviewer.metrics.status in BUSY_STATUSES:
+                    future.cancel()
+                    del review_futures[future]
+
+            # Stage 1 may have stopped early: the remaining reviewers use the opinions gathered
+            outstanding.clear()
+            start_ready_reviews()
+            results = [future.result() for future in self._as_completed(review_futures, "Stage 2")]
+        finally:
+            for future in review_futures:
+                future.cancel()
+
+        self._attach_reviews(opinions, results)
+        return opinions
+
+    def _perform_review(self, query: str, reviewer: CouncilMember, candidates: List[Opinion]):
+        raw_review, parsed = reviewer.review_all(query, candidates)
+        return reviewer.name, candidates, raw_review, parsed
+
+    def _attach_reviews(self, opinions: List[Opinion], results: list):
+        """
+        Attaches the results of `_perform_review` to the reviewed opinions and averages their
+        scores. Reviews that could not be split per answer go to `general_reviews` instead.
+        """
+        scores = {op.member_name: [] for op in opinions}
+        self.general_reviews = {}
+        for reviewer_name, candidates, raw_review, parsed in results:
+            # Each critique goes only to the answer it is about
+            for index, (score, critique) in parsed.items():
+                op = candidates[index]
+                op.reviews.append(f"Review by {reviewer_name} (score {score:g}/10):\n{critique}")
+                scores[op.member_name].append(score)
+            if raw_review and len(parsed) < len(candidates):
+                # Answers without a parsed critique: the raw review is kept once for the
+                # Chairman rather than copied to every candidate
+                self.general_reviews[reviewer_name] = raw_review
+
+        for op in opinions:
+            if scores[op.member_name]:
+                op.score = sum(scores[op.member_name]) / len(scores[op.member_name])
+
+    def synthesize(self, query: str, opinions: List[Opinion]) -> Tuple[str, float]:
+        """Stage 3: Let the Chairman synthesize the final answer, reusing a cached verdict when possible."""
+        cached = self._cached_run(query)
+        if cached:
+            return cached["final_answer"], 0.0
+
+        final_answer, latency = self._hedged_synthesize(query, opinions)
+        if final_answer is None:
+            return "Failed to generate synthesis.", latency
+        if self.semantic_cache is not None:
+            self.semantic_cache.store(query, self._council_signature(), [asdict(op) for op in opinions], final_answer)
+        return final_answer, latency
+
+    def synthesize_stream(self, query: str, opinions: List[Opinion]) -> Iterator[str]:
+        """
+        Stage 3, streamed: yields the Chairman's answer as it is written, reusing a cached verdict when possible.
+        A candidate that fails before writing anything is replaced by the next ranked one; a failure
+        mid-answer is re-raised, as its first chunks are already shown.
+        """
+        cached = self._cached_run(query)
+        if cached:
+            yield cached["final_answer"]
+            return
+
+        ranked = self._ranked_chairmen() or [self.chairman]
+        parts = []
+        for i, chairman in enumerate(ranked):
+            try:
+                for chunk in chairman.synthesize_stream(query, opinions, self.general_reviews):
+                    parts.append(chunk)
+                    yield chunk
+                break
+            except (requests.RequestException, ValueError):
+                if parts or i == len(ranked) - 1:
+                    raise
+                print(f"{chairman.name} failed to synthesize, asking {ranked[i + 1].name}.")
+
+        if self.semantic_cache is not None and parts:
+            self.semantic_cache.store(query, self._council_signature(), [asdict(op) for op in opinions], "".join(parts))
+
     def run_council(self, query: str) -> Dict:
         """Executes the full 3-stage workflow."""
         
-        # Stage 1
-        opinions = self.gather_opinions(query)
-        if not opinions:
+        # Stages 1 and 2, with reviews starting as soon as their inputs are ready
+        reviewed_opinions = self.gather_and_review(query)
+        if not reviewed_opinions:
             return {"error": "No opinions gathered."}
 
-        # Stage 2
-        reviewed_opinions = self.peer_review(query, opinions)
-
         # Stage 3
-        final_answer, chairman_latency = self.chairman.synthesize(query, reviewed_opinions)
+        final_answer, chairman_latency = self.synthesize(query, reviewed_opinions)
 
         return {
             "opinions": reviewed_opinions,